@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Load benchmark: interactive latency while many dashboards live-tail.
+
+Builds a throwaway agents directory and, for each client count, starts the
+viewer as its own process (with and without the request scheduler) and
+runs that many tailing clients against it: background transcript polls
+every 2 seconds plus session refreshes, as the UI sends them, each over a
+keep-alive connection. Every transcript keeps growing while this runs.
+Meanwhile a single user pages through transcripts, and its latency is
+reported as p50/p99, the median over --repeat runs per arm.
+
+By default clients don't revalidate with If-None-Match and the server's
+page cache is off, so the two arms differ only in scheduling. With
+--http-cache both arms use them, as browsers do.
+
+All clients connect from 127.0.0.1, as they would through an SSH tunnel,
+and tell themselves apart with the X-Client-Id header the UI sends. The
+load runs in separate processes so it doesn't share the measuring
+process's interpreter lock, at a lower OS priority so that on small
+machines they don't take CPU from the server under test.
+
+    python benchmarks/tail_load.py --clients 0 20 40 80
+"""
+
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+LOAD_PROCESSES = 4
+
+
+def transcript_line(i):
+    # Mostly tool traffic with multi-KB results, like a busy agent
+    if i % 3 == 0:
+        content = [{'type': 'text', 'text': f"line {i} " + 'x' * 400}]
+    elif i % 3 == 1:
+        content = [{'type': 'tool_use', 'name': 'exec', 'input': {'command': 'y' * 300}}]
+    else:
+        content = [{'type': 'tool_result', 'tool_use_id': f"toolu_{i}", 'content': 'z' * 4000}]
+    return json.dumps({
+        'type': 'message',
+        'timestamp': f"2026-01-01T00:00:{i % 60:02d}.000Z",
+        'message': {'role': 'user' if i % 2 else 'assistant', 'content': content}
+    }) + '\n'
+
+
+def make_agents_dir(path, sessions, lines):
+    sessions_dir = os.path.join(path, 'bench', 'sessions')
+    os.makedirs(sessions_dir)
+    index = {}
+    for n in range(sessions):
+        session_id = f"s{n}"
+        index[f"agent:bench:{n}"] = {'sessionId': session_id, 'displayName': f"Bench {n}", 'updatedAt': n}
+        with open(os.path.join(sessions_dir, f"{session_id}.jsonl"), 'w') as f:
+            for i in range(lines):
+                f.write(transcript_line(i))
+    with open(os.path.join(sessions_dir, 'sessions.json'), 'w') as f:
+        json.dump(index, f)
+    return sessions_dir, sorted(index)
+
+
+def writer(sessions_dir, sessions, interval, stop):
+    """Keep appending to every transcript, like agents that are working"""
+    i = 0
+    while not stop.wait(interval):
+        for n in range(sessions):
+            with open(os.path.join(sessions_dir, f"s{n}.jsonl"), 'a') as f:
+                f.write(transcript_line(i))
+        i += 1
+
+
+class Client:
+    """One browser tab: a keep-alive connection, a tab id and an ETag cache"""
+
+    def __init__(self, port, client_id, revalidate=False):
+        self.port = port
+        self.client_id = client_id
+        self.conn = None
+        self.etags = {} if revalidate else None
+
+    def get(self, path, background=False):
+        """GET a path, revalidating with If-None-Match if enabled, and return the status"""
+        headers = {'X-Client-Id': self.client_id}
+        if background:
+            headers['X-Request-Priority'] = 'background'
+        if self.etags is not None and path in self.etags:
+            headers['If-None-Match'] = self.etags[path]
+        for attempt in (1, 2):
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection('127.0.0.1', self.port)
+            try:
+                self.conn.request('GET', path, headers=headers)
+                resp = self.conn.getresponse()
+                resp.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # Server closed the idle connection; reconnect once
+                self.conn.close()
+                self.conn = None
+                if attempt == 2:
+                    raise
+        if self.etags is not None and resp.getheader('ETag'):
+            self.etags[path] = resp.getheader('ETag')
+        if resp.will_close:
+            self.conn.close()
+            self.conn = None
+        return resp.status
+
+
+def tail_client(port, key, client_id, interval, revalidate, stop, counts, lock):
+    client = Client(port, client_id, revalidate)
+    n = 0
+    while not stop.is_set():
+        statuses = [client.get(f"/api/transcript?key={key}&tools=true&limit=100&offset=0", True)]
+        if n % 5 == 0:
+            statuses.append(client.get("/api/sessions", True))
+        with lock:
+            counts[0] += len(statuses)
+            counts[1] += sum(1 for status in statuses if status not in (200, 304))
+        n += 1
+        stop.wait(interval)
+
+
+def load_process(port, keys, first, clients, interval, revalidate, stop, counts):
+    """Run a share of the tailing clients as threads of one process"""
+    # Real dashboards are browsers on other machines; on a small box, keep
+    # the load generator from taking CPU away from the server under test
+    os.nice(19)
+    lock = threading.Lock()
+    local = [0, 0]
+    threads = [threading.Thread(target=tail_client, daemon=True,
+                                args=(port, keys[i % len(keys)], f"tab-{i}", interval, revalidate,
+                                      stop, local, lock))
+               for i in range(first, first + clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with counts.get_lock():
+        counts[0] += local[0]
+        counts[1] += local[1]
+
+
+def start_server(agents_dir, scheduler, http_cache):
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    cmd = [sys.executable, str(ROOT / 'session-viewer.py'), '--agents-dir', agents_dir,
+           '--host', '127.0.0.1', '--port', str(port)]
+    if not scheduler:
+        cmd.append('--no-scheduler')
+    if not http_cache:
+        cmd += ['--page-cache-mb', '0']
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            Client(port, 'bench').get('/')
+            return proc, port
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("viewer did not start")
+
+
+def run(port, keys, clients, requests, interval, revalidate, sessions_dir, write_interval):
+    stop = multiprocessing.Event()
+    threading.Thread(target=writer, args=(sessions_dir, len(keys), write_interval, stop), daemon=True).start()
+    counts = multiprocessing.Array('q', 2)
+    share = [clients // LOAD_PROCESSES + (i < clients % LOAD_PROCESSES) for i in range(LOAD_PROCESSES)]
+    procs = [multiprocessing.Process(target=load_process,
+                                     args=(port, keys, sum(share[:i]), share[i], interval, revalidate,
+                                           stop, counts))
+             for i in range(LOAD_PROCESSES) if share[i]]
+    for p in procs:
+        p.start()
+    time.sleep(max(interval * 4, 1))
+
+    # The user pages through transcripts without tool entries, so their
+    # requests don't hit pages the tailing clients already had built
+    user = Client(port, 'user', revalidate)
+    latencies = []
+    for i in range(requests):
+        key = keys[i % len(keys)]
+        offset = 100 * (i // len(keys))
+        start = time.perf_counter()
+        user.get(f"/api/transcript?key={key}&tools=false&limit=100&offset={offset}")
+        latencies.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.05)
+
+    stop.set()
+    for p in procs:
+        p.join()
+    latencies.sort()
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99) - 1], counts[0], counts[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, nargs='+', default=[0, 20, 80])
+    parser.add_argument('--sessions', type=int, default=4)
+    parser.add_argument('--lines', type=int, default=20000, help="transcript lines per session")
+    parser.add_argument('--requests', type=int, default=100, help="interactive requests per run")
+    parser.add_argument('--repeat', type=int, default=3, help="runs per arm; medians are reported")
+    parser.add_argument('--interval', type=float, default=2.0, help="seconds between polls per tailing client")
+    parser.add_argument('--write-interval', type=float, default=0.5, help="seconds between appends to each transcript")
+    parser.add_argument('--http-cache', action='store_true',
+                        help="revalidate with ETags and keep the server's page cache on (both arms)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sessions_dir, keys = make_agents_dir(tmp, args.sessions, args.lines)
+
+        print(f"{'clients':>8}  {'scheduler':>9}  {'p50 ms':>8}  {'p99 ms':>8}  {'polls':>7}  {'rejected':>8}")
+        for clients in args.clients:
+            # Alternate the arms so drift on a shared machine hits both alike
+            results = {False: [], True: []}
+            for _ in range(args.repeat):
+                for scheduler in (False, True):
+                    proc, port = start_server(tmp, scheduler, args.http_cache)
+                    try:
+                        # Warm the transcript index so runs measure steady-state polling
+                        warmup = Client(port, 'warmup')
+                        for key in keys:
+                            warmup.get(f"/api/transcript?key={key}")
+                        results[scheduler].append(run(port, keys, clients, args.requests, args.interval,
+                                                      args.http_cache, sessions_dir, args.write_interval))
+                    finally:
+                        proc.terminate()
+                        proc.wait()
+            for scheduler in (False, True):
+                p50s, p99s, polls, rejected = zip(*results[scheduler])
+                print(f"{clients:>8}  {'on' if scheduler else 'off':>9}  {statistics.median(p50s):>8.1f}  "
+                      f"{statistics.median(p99s):>8.1f}  {sum(polls):>7}  {sum(rejected):>8}")
+
+if __name__ == '__main__':
+    main()
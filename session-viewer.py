@@ -4,10 +4,21 @@ Real-time Session Viewer for OpenClaw
 Shows active sessions, token usage, and live transcript tails
 """
 
-from flask import Flask, render_template_string, jsonify, request
+from flask import Flask, render_template_string, jsonify, request, g
+import argparse
+import bisect
+import csv
+import itertools
 import json
 import os
 import glob
+import math
+import sys
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
@@ -123,6 +134,20 @@ HTML_TEMPLATE = """
         .usage-fill.warning { background: #d29922; }
         .usage-fill.danger { background: #f85149; }
         
+        .sparkline { height: 24px; margin-top: 6px; }
+        .sparkline svg { width: 100%; height: 100%; display: block; }
+        .sparkline polyline {
+            fill: none;
+            stroke: #58a6ff;
+            stroke-width: 1;
+            vector-effect: non-scaling-stroke;
+        }
+        .spark-compaction {
+            stroke: #d29922;
+            stroke-dasharray: 2 2;
+            vector-effect: non-scaling-stroke;
+        }
+        
         .transcript-viewer {
             background: #161b22;
             border: 1px solid #30363d;
@@ -357,8 +382,24 @@ HTML_TEMPLATE = """
             });
         }
         
-        async function loadSessions() {
-            const res = await fetch('/api/sessions');
+        // Polls and tail refreshes are sent as background requests so the
+        // server can serve clicks first; a 429/503 just skips this tick.
+        
+        // Rate limits are per tab, which matters behind an SSH tunnel where
+        // every tab connects from the same address.
+        const CLIENT_ID = Math.random().toString(36).slice(2);
+        
+        function fetchApi(url) {
+            return fetch(url, { headers: { 'X-Client-Id': CLIENT_ID } });
+        }
+        
+        function fetchBackground(url) {
+            return fetch(url, { headers: { 'X-Client-Id': CLIENT_ID, 'X-Request-Priority': 'background' } });
+        }
+        
+        async function loadSessions(background = false) {
+            const res = await (background ? fetchBackground : fetchApi)('/api/sessions');
+            if (!res.ok) return;
             allSessions = await res.json();
             
             const sessions = filterSessions(allSessions);
@@ -391,9 +432,63 @@ HTML_TEMPLATE = """
                         <div class="usage-bar">
                             <div class="usage-fill ${usageClass}" style="width: ${pct}%"></div>
                         </div>
+                        <div class="sparkline" data-key="${s.key}">${sparklines[s.key] ? sparklines[s.key].svg : ''}</div>
                     </div>
                 `;
             }).join('');
+            
+            updateSparklines(sessions);
+        }
+        
+        // Context-growth sparklines, cached per session and refetched only
+        // when the session file has grown, so the 10s refresh just reuses them
+        const sparklines = {};
+        const SPARKLINE_BATCH = 50;
+        let sparklinesBusy = false;
+        
+        function buildSparkline(data, contextTokens) {
+            const pts = data.points;
+            if (pts.length < 2) return '';
+            const t0 = pts[0][0];
+            const span = (pts[pts.length - 1][0] - t0) || 1;
+            const top = Math.max(contextTokens, data.peak) || 1;
+            const x = t => ((t - t0) / span * 100).toFixed(2);
+            const y = v => (24 - v / top * 24).toFixed(2);
+            const line = pts.map(p => `${x(p[0])},${y(p[1])}`).join(' ');
+            const marks = data.compactions.map(c => 
+                `<line class="spark-compaction" x1="${x(c.t)}" x2="${x(c.t)}" y1="0" y2="24"/>`).join('');
+            return `<svg viewBox="0 0 100 24" preserveAspectRatio="none">${marks}<polyline points="${line}"/></svg>`;
+        }
+        
+        // Stale sparklines of the listed sessions are fetched in batches;
+        // ones the server is still indexing are retried a few seconds later
+        async function updateSparklines(sessions) {
+            if (sparklinesBusy) return;
+            sparklinesBusy = true;
+            try {
+                const stale = sessions.filter(s => s.fileSize && !(sparklines[s.key] && sparklines[s.key].size === s.fileSize));
+                let pending = false;
+                for (let i = 0; i < stale.length; i += SPARKLINE_BATCH) {
+                    const batch = stale.slice(i, i + SPARKLINE_BATCH);
+                    const keys = batch.map(s => `key=${encodeURIComponent(s.key)}`).join('&');
+                    const res = await fetchBackground(`/api/timelines?buckets=50&${keys}`);
+                    if (!res.ok) return;
+                    const data = await res.json();
+                    for (const s of batch) {
+                        const timeline = data[s.key];
+                        if (!timeline || timeline.pending) {
+                            pending = true;
+                            continue;
+                        }
+                        sparklines[s.key] = { size: s.fileSize, svg: buildSparkline(timeline, s.contextTokens) };
+                        const el = document.querySelector(`.sparkline[data-key="${CSS.escape(s.key)}"]`);
+                        if (el) el.innerHTML = sparklines[s.key].svg;
+                    }
+                }
+                if (pending) setTimeout(() => updateSparklines(filterSessions(allSessions)), 3000);
+            } finally {
+                sparklinesBusy = false;
+            }
         }
         
         async function selectSession(key) {
@@ -406,13 +501,15 @@ HTML_TEMPLATE = """
         let currentOffset = 0;
         const PAGE_SIZE = 100;
         
-        async function refreshTranscript() {
+        async function refreshTranscript(background = false) {
             if (!selectedSession) return;
-            currentOffset = 0;
             
             const showTools = document.getElementById('show-tools').checked;
-            const res = await fetch(`/api/transcript?key=${encodeURIComponent(selectedSession)}&tools=${showTools}&limit=${PAGE_SIZE}&offset=0`);
+            const url = `/api/transcript?key=${encodeURIComponent(selectedSession)}&tools=${showTools}&limit=${PAGE_SIZE}&offset=0`;
+            const res = await (background ? fetchBackground : fetchApi)(url);
+            if (!res.ok) return;
             const data = await res.json();
+            currentOffset = 0;
             
             document.getElementById('transcript-title').textContent = 
                 `${data.displayName || selectedSession} — ${data.total} entries`;
@@ -472,7 +569,8 @@ HTML_TEMPLATE = """
         async function loadMore() {
             if (!selectedSession) return;
             const showTools = document.getElementById('show-tools').checked;
-            const res = await fetch(`/api/transcript?key=${encodeURIComponent(selectedSession)}&tools=${showTools}&limit=${PAGE_SIZE}&offset=${currentOffset}`);
+            const res = await fetchApi(`/api/transcript?key=${encodeURIComponent(selectedSession)}&tools=${showTools}&limit=${PAGE_SIZE}&offset=${currentOffset}`);
+            if (!res.ok) return;
             const data = await res.json();
             
             currentOffset += PAGE_SIZE;
@@ -514,7 +612,7 @@ HTML_TEMPLATE = """
                 tailInterval = null;
                 btn.classList.remove('active');
             } else {
-                tailInterval = setInterval(refreshTranscript, 2000);
+                tailInterval = setInterval(() => refreshTranscript(true), 2000);
                 btn.classList.add('active');
                 refreshTranscript();
             }
@@ -536,64 +634,132 @@ HTML_TEMPLATE = """
         
         // Initial load
         loadSessions();
-        setInterval(loadSessions, 10000);
+        setInterval(() => loadSessions(true), 10000);
     </script>
 </body>
 </html>
 """
 
-@app.route('/')
-def index():
-    return render_template_string(HTML_TEMPLATE)
+# Line types OpenClaw writes that carry nothing to display. Anything not listed
+# here or handled by parse_record is counted as an unknown type.
+QUIET_TYPES = {'session', 'model_change', 'thinking_level_change', 'branch_summary',
+               'custom', 'custom_message', 'label'}
+TOOL_ROLES = ('tool_use', 'tool_result')
+# Lines kept across all cached transcript indexes (about 40 bytes each)
+MAX_INDEXED_LINES = 2000000
+# Serialised transcript pages kept for other clients asking for the same one
+PAGE_CACHE_BYTES = 16 * 1024 * 1024
+TIMELINE_BUCKETS = 120
+# Sessions per /api/timelines request
+MAX_TIMELINE_KEYS = 200
+# Transcripts with more unindexed bytes than this are indexed by the warm-up
+# thread rather than inside a background request (about 60 ms of parsing)
+COLD_INDEX_BYTES = 8 * 1024 * 1024
 
-@app.route('/api/sessions')
-def api_sessions():
+# Background API requests (polls, tail refreshes) allowed to run at once
+BACKGROUND_WORKERS = 1
+# Per client and priority: (requests per second, burst)
+RATE_LIMITS = {'interactive': (20.0, 40), 'background': (4.0, 8), 'timelines': (1.0, 4)}
+# Endpoints limited by their own bucket instead of their priority's, so
+# sparkline batches don't spend the tokens live tail needs
+RATE_BUCKETS = {'/api/timelines': 'timelines'}
+# Seconds a background request may queue before it is answered with 503
+BACKGROUND_QUEUE_TIMEOUT = 5.0
+# Rate-limit buckets kept, least recently seen clients evicted first
+MAX_TRACKED_CLIENTS = 1024
+
+# sessions.json files (and individual entries) that could not be read on the
+# last discovery pass, keyed by path or "path#key"
+discovery_errors = {}
+
+class SkipLine(Exception):
+    """A transcript line that decoded fine but can't be shown"""
+
+    def __init__(self, kind, reason):
+        super().__init__(reason)
+        self.kind = kind
+
+class ParseStats:
+    """Tally of transcript lines the parser could not turn into entries"""
+
+    MAX_RECORDED = 100
+
+    def __init__(self):
+        self.lines = 0
+        self.malformed = 0
+        self.unknown_type = 0
+        self.pending = None  # end offset of an unfinished trailing line
+        self.skipped = deque(maxlen=self.MAX_RECORDED)
+
+    def skip(self, offset, kind, reason):
+        if kind == 'unknownType':
+            self.unknown_type += 1
+        else:
+            self.malformed += 1
+        self.skipped.append({'offset': offset, 'kind': kind, 'reason': reason})
+
+    def to_dict(self):
+        return {
+            'lines': self.lines,
+            'malformed': self.malformed,
+            'unknownType': self.unknown_type,
+            'partialLine': self.pending is not None,
+            'skipped': list(self.skipped)
+        }
+
+def _session_record(agent_dir, key, entry):
+    session_id = entry.get('sessionId', '')
+    session_file = os.path.join(agent_dir, f"{session_id}.jsonl")
+    file_size = os.path.getsize(session_file) if os.path.exists(session_file) else 0
+
+    return {
+        'key': key,
+        'displayName': entry.get('displayName', key),
+        'totalTokens': entry.get('totalTokens', 0) or 0,
+        'contextTokens': entry.get('contextTokens', 200000) or 200000,
+        'inputTokens': entry.get('inputTokens', 0) or 0,
+        'outputTokens': entry.get('outputTokens', 0) or 0,
+        'model': entry.get('model', 'unknown'),
+        'updatedAt': entry.get('updatedAt', 0),
+        'fileSize': file_size,
+        'sessionFile': session_file
+    }
+
+def list_sessions():
+    """Collect session metadata from every agent, most recently updated first"""
     sessions = []
-    
+    errors = {}
+
     for agent_dir in glob.glob(f"{AGENTS_DIR}/*/sessions"):
         sessions_json = os.path.join(agent_dir, "sessions.json")
         if not os.path.exists(sessions_json):
             continue
-            
+
         try:
             with open(sessions_json) as f:
                 data = json.load(f)
-            
-            for key, entry in data.items():
-                session_id = entry.get('sessionId', '')
-                session_file = os.path.join(agent_dir, f"{session_id}.jsonl")
-                file_size = os.path.getsize(session_file) if os.path.exists(session_file) else 0
-                
-                sessions.append({
-                    'key': key,
-                    'displayName': entry.get('displayName', key),
-                    'totalTokens': entry.get('totalTokens', 0) or 0,
-                    'contextTokens': entry.get('contextTokens', 200000) or 200000,
-                    'inputTokens': entry.get('inputTokens', 0) or 0,
-                    'outputTokens': entry.get('outputTokens', 0) or 0,
-                    'model': entry.get('model', 'unknown'),
-                    'updatedAt': entry.get('updatedAt', 0),
-                    'fileSize': file_size,
-                    'sessionFile': session_file
-                })
+            if not isinstance(data, dict):
+                raise ValueError(f"expected an object, got {type(data).__name__}")
         except Exception as e:
+            errors[sessions_json] = str(e)
             continue
-    
+
+        # One bad entry shouldn't hide the rest of the agent's sessions
+        for key, entry in data.items():
+            try:
+                sessions.append(_session_record(agent_dir, key, entry))
+            except Exception as e:
+                errors[f"{sessions_json}#{key}"] = str(e)
+
+    discovery_errors.clear()
+    discovery_errors.update(errors)
+
     # Sort by most recently updated
-    sessions.sort(key=lambda x: x.get('updatedAt', 0), reverse=True)
-    return jsonify(sessions)
+    sessions.sort(key=lambda x: x.get('updatedAt', 0) or 0, reverse=True)
+    return sessions
 
-@app.route('/api/transcript')
-def api_transcript():
-    key = request.args.get('key', '')
-    show_tools = request.args.get('tools', 'true') == 'true'
-    limit = int(request.args.get('limit', '200'))
-    offset = int(request.args.get('offset', '0'))
-    
-    # Find the session
-    session_file = None
-    display_name = key
-    
+def find_session(key):
+    """Return (session_file, display_name) for a session key, or (None, key)"""
     for agent_dir in glob.glob(f"{AGENTS_DIR}/*/sessions"):
         sessions_json = os.path.join(agent_dir, "sessions.json")
         if not os.path.exists(sessions_json):
@@ -605,123 +771,1010 @@ def api_transcript():
                 entry = data[key]
                 session_id = entry.get('sessionId', '')
                 session_file = os.path.join(agent_dir, f"{session_id}.jsonl")
-                display_name = entry.get('displayName', key)
-                break
-        except:
+                return session_file, entry.get('displayName', key)
+        except Exception as e:
+            discovery_errors[sessions_json] = str(e)
             continue
-    
-    if not session_file or not os.path.exists(session_file):
-        return jsonify({'entries': [], 'displayName': display_name})
-    
+
+    return None, key
+
+def parse_record(obj, show_tools=True, content=True, full=False):
+    """Turn one decoded transcript line into zero or more display entries.
+
+    'chars' and 'estimatedTokens' always describe the full part, even when
+    'content' is cut short for display. With full=True nothing is cut: tool
+    input is the compact JSON that was sent, and tool results and compaction
+    summaries are kept whole, for exports. With content=False the display
+    text of tool parts isn't built ('content' is None), for callers that
+    only count.
+    Raises SkipLine for lines of an unknown type or an unexpected shape.
+    """
     entries = []
-    try:
-        with open(session_file) as f:
-            for line in f:
-                line = line.strip()
-                if not line:
+    if not isinstance(obj, dict):
+        raise SkipLine('malformed', f"line is a JSON {type(obj).__name__}, not an object")
+    entry_type = obj.get('type', '')
+
+    timestamp = obj.get('timestamp', '')
+
+    # Handle compaction entries
+    if entry_type == 'compaction':
+        summary = str(obj.get('summary') or '')
+        tokens_before = obj.get('tokensBefore', 0)
+        entries.append({
+            'role': 'system',
+            'toolName': 'compaction',
+            'content': summary if full else f"[COMPACTION - {tokens_before} tokens before]\n{summary[:1000]}...",
+            'chars': len(summary),
+            'estimatedTokens': len(summary) // 4,
+            'timestamp': timestamp
+        })
+        return entries
+
+    # Only process message entries
+    if entry_type != 'message':
+        if entry_type in QUIET_TYPES:
+            return entries
+        raise SkipLine('unknownType', f"unknown type {entry_type!r}")
+
+    # Extract message object
+    msg = obj.get('message', {})
+    if not isinstance(msg, dict):
+        raise SkipLine('malformed', f"message is a {type(msg).__name__}, not an object")
+    role = msg.get('role', 'unknown')
+    content_parts = msg.get('content', [])
+
+    # Process content
+    for part in content_parts if isinstance(content_parts, list) else [content_parts]:
+        if isinstance(part, str):
+            text = part
+            char_count = len(text)
+            entry_role = role
+            tool_name = None
+        elif isinstance(part, dict):
+            part_type = part.get('type', '')
+
+            if part_type == 'text':
+                text = str(part.get('text') or '')
+                char_count = len(text)
+                entry_role = role
+                tool_name = None
+            elif part_type == 'tool_use':
+                if not show_tools:
                     continue
-                try:
-                    obj = json.loads(line)
-                    entry_type = obj.get('type', '')
-                    
-                    timestamp = obj.get('timestamp', '')
-
-                    # Handle compaction entries
-                    if entry_type == 'compaction':
-                        summary = obj.get('summary', '')
-                        tokens_before = obj.get('tokensBefore', 0)
-                        entries.append({
-                            'role': 'system',
-                            'toolName': 'compaction',
-                            'content': f"[COMPACTION - {tokens_before} tokens before]\n{summary[:1000]}...",
-                            'chars': len(summary),
-                            'estimatedTokens': len(summary) // 4,
-                            'timestamp': timestamp
-                        })
-                        continue
-
-                    # Only process message entries
-                    if entry_type != 'message':
-                        continue
-
-                    # Extract message object
-                    msg = obj.get('message', {})
-                    role = msg.get('role', 'unknown')
-                    content_parts = msg.get('content', [])
-
-                    # Process content
-                    for part in content_parts if isinstance(content_parts, list) else [content_parts]:
-                        if isinstance(part, str):
-                            text = part
-                            entry_role = role
-                            tool_name = None
-                        elif isinstance(part, dict):
-                            part_type = part.get('type', '')
-
-                            if part_type == 'text':
-                                text = part.get('text', '')
-                                entry_role = role
-                                tool_name = None
-                            elif part_type == 'tool_use':
-                                if not show_tools:
-                                    continue
-                                tool_name = part.get('name', 'unknown')
-                                tool_input = part.get('input', {})
-                                text = json.dumps(tool_input, indent=2)[:5000]
-                                entry_role = 'tool_use'
-                            elif part_type == 'tool_result':
-                                if not show_tools:
-                                    continue
-                                tool_name = part.get('tool_use_id', '')[:8]
-                                result = part.get('content', '')
-                                if isinstance(result, list):
-                                    result = ' '.join(str(r.get('text', r)) for r in result if isinstance(r, dict))
-                                text = str(result)[:5000]
-                                entry_role = 'tool_result'
-                            elif part_type == 'image':
-                                text = '[Image: base64 data]'
-                                entry_role = role
-                                tool_name = None
-                            else:
-                                continue
-                        else:
-                            continue
-
-                        char_count = len(text)
-                        entries.append({
-                            'role': entry_role,
-                            'toolName': tool_name,
-                            'content': text,
-                            'chars': char_count,
-                            'estimatedTokens': char_count // 4,
-                            'timestamp': timestamp
-                        })
-                except json.JSONDecodeError:
+                tool_name = str(part.get('name') or 'unknown')
+                tool_input = part.get('input', {})
+                # Size the compact form the model sees; indent only for display
+                compact = json.dumps(tool_input)
+                char_count = len(compact)
+                if full:
+                    text = compact
+                else:
+                    text = json.dumps(tool_input, indent=2)[:5000] if content else None
+                entry_role = 'tool_use'
+            elif part_type == 'tool_result':
+                if not show_tools:
                     continue
+                tool_name = str(part.get('tool_use_id') or '')[:8]
+                result = part.get('content', '')
+                if isinstance(result, list):
+                    result = ' '.join(str(r.get('text', r)) if isinstance(r, dict) else str(r) for r in result)
+                result = str(result)
+                char_count = len(result)
+                text = result if full else result[:5000] if content else None
+                entry_role = 'tool_result'
+            elif part_type == 'image':
+                text = '[Image: base64 data]'
+                char_count = len(text)
+                entry_role = role
+                tool_name = None
+            else:
+                continue
+        else:
+            continue
+
+        entries.append({
+            'role': entry_role,
+            'toolName': tool_name,
+            'content': text,
+            'chars': char_count,
+            'estimatedTokens': char_count // 4,
+            'timestamp': timestamp
+        })
+
+    return entries
+
+def iter_lines(f, start=0):
+    """Yield (byte_offset, raw_line) from a binary file handle"""
+    f.seek(start)
+    offset = start
+    for raw in f:
+        yield offset, raw
+        offset += len(raw)
+
+def iter_lines_reversed(f, end, block_size=1 << 16):
+    """Yield (byte_offset, raw_line) from a binary file handle, last line first.
+
+    Reads backwards from end in blocks, so only the tail of the file is read
+    when the caller stops early.
+    """
+    pos = end
+    buf = b''
+    stop = 0  # buf[:stop] is still unyielded
+    while True:
+        i = buf.rfind(b'\n', 0, stop - 1) if stop > 1 else -1
+        if i >= 0:
+            yield pos + i + 1, buf[i + 1:stop]
+            stop = i + 1
+            continue
+        if pos == 0:
+            if stop:
+                yield 0, buf[:stop]
+            return
+        read = min(block_size, pos)
+        pos -= read
+        f.seek(pos)
+        buf = f.read(read) + buf[:stop]
+        stop = len(buf)
+
+def _parse_line(raw, offset, stats, show_tools=True, content=True, full=False):
+    """Entries for one complete transcript line, tallying it in stats"""
+    line = raw.strip()
+    if not line:
+        return []
+    try:
+        obj = json.loads(line)
+    except ValueError as e:
+        stats.skip(offset, 'malformed', f"invalid JSON: {e}")
+        return []
+
+    stats.lines += 1
+    try:
+        return parse_record(obj, show_tools, content, full)
+    except SkipLine as e:
+        stats.skip(offset, e.kind, str(e))
     except Exception as e:
-        pass
+        stats.skip(offset, 'malformed', f"unexpected shape: {e!r}")
+    return []
+
+def _is_unfinished(raw):
+    """True for a trailing line with no newline that isn't valid JSON yet"""
+    if raw.endswith(b'\n') or not raw.strip():
+        return False
+    try:
+        json.loads(raw)
+    except ValueError:
+        return True
+    return False
+
+def scan_transcript(f, stats, show_tools=True, start=0, content=True, full=False):
+    """Yield (next_offset, entries) for each line of a binary transcript handle.
+
+    Lines that can't be shown are tallied in stats with their byte offset. A
+    trailing line that isn't valid JSON yet is most likely still being
+    flushed, so it is left unconsumed and its end offset recorded in
+    stats.pending instead of being counted as malformed.
+    """
+    stats.pending = None
+    for offset, raw in iter_lines(f, start):
+        end = offset + len(raw)
+        if _is_unfinished(raw):
+            stats.pending = end
+            return
+        yield end, _parse_line(raw, offset, stats, show_tools, content, full)
+
+def iter_transcript(session_file, show_tools=True, start=0, stats=None, full=False):
+    """Stream display entries from a session file in chronological order"""
+    if stats is None:
+        stats = ParseStats()
+    with open(session_file, 'rb') as f:
+        for _, entries in scan_transcript(f, stats, show_tools, start, full=full):
+            yield from entries
+
+def _timestamp_ms(value):
+    """Epoch milliseconds from an ISO-8601 string or numeric timestamp, or None"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value if value > 1e12 else value * 1000)
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000
+        except ValueError:
+            return None
+    return None
+
+def downsample_minmax(times, values, buckets):
+    """Reduce a series to the min and max point of each time bucket.
+
+    Keeps peaks and compaction drops intact, which is what matters for a
+    context-growth chart. Returns [[time, value], ...] in time order.
+    """
+    n = len(times)
+    if n <= buckets * 2:
+        return [[times[i], values[i]] for i in range(n)]
+
+    t0 = times[0]
+    span = (times[-1] - t0) or 1
+    picked = []
+    current = lo = hi = None
+    for i in range(n):
+        bucket = min(int((times[i] - t0) / span * buckets), buckets - 1)
+        if bucket != current:
+            if current is not None:
+                picked.extend(sorted({lo, hi}))
+            current, lo, hi = bucket, i, i
+        elif values[i] < values[lo]:
+            lo = i
+        elif values[i] > values[hi]:
+            hi = i
+    picked.extend(sorted({lo, hi}))
+
+    if picked[-1] != n - 1:
+        picked.append(n - 1)
+    return [[times[i], values[i]] for i in picked]
+
+class TranscriptIndex:
+    """Index and context-growth timeline of one session file.
+
+    Built in a single pass that counts entries without building their
+    display text, and extended as the file grows: only bytes appended since
+    the last refresh are parsed, so bad lines are accounted for once and an
+    unfinished trailing line is retried only after the file has grown past
+    it.
+
+    For paging it keeps the byte offset of each line that produces entries,
+    with running entry counts (with and without tool entries), and re-parses
+    just the lines a page needs. The timeline is one point per such line:
+    cumulative estimated tokens, reset to the summary size at each
+    compaction, which is recorded with the total just before it.
+    """
+
+    def __init__(self, session_file):
+        self.session_file = session_file
+        self.lock = threading.Lock()
+        self._reset(None)
+
+    def _reset(self, identity):
+        self.identity = identity
+        self.offset = 0
+        self.stats = ParseStats()
+        self.line_offsets = array('q')
+        self.all_counts = array('q')      # entries up to and including each line
+        self.message_counts = array('q')  # same, without tool use/results
+        self.times = array('d')
+        self.tokens = array('q')
+        self.compactions = []
+        self.running = 0
+        self.peak = 0
+        self.last_time = None
+        self.last_stamp = self.last_stamp_ms = None
+        self._downsampled = {}
+
+    def refresh(self):
+        st = os.stat(self.session_file)
+        identity = (st.st_dev, st.st_ino)
+        if identity != self.identity or st.st_size < self.offset:
+            # New file, or rewritten in place: start over
+            self._reset(identity)
+        if st.st_size == self.offset or st.st_size == self.stats.pending:
+            return
+
+        with open(self.session_file, 'rb') as f:
+            for end, entries in scan_transcript(f, self.stats, start=self.offset, content=False):
+                offset, self.offset = self.offset, end
+                if entries:
+                    self._add_line(offset, entries)
+        self._downsampled.clear()
+
+    def _add_line(self, offset, entries):
+        messages = sum(1 for entry in entries if entry['role'] not in TOOL_ROLES)
+        self.line_offsets.append(offset)
+        self.all_counts.append((self.all_counts[-1] if self.all_counts else 0) + len(entries))
+        self.message_counts.append((self.message_counts[-1] if self.message_counts else 0) + messages)
+
+        stamp = entries[0]['timestamp']
+        if stamp != self.last_stamp:
+            # Consecutive lines often share a timestamp; parse each one once
+            self.last_stamp, self.last_stamp_ms = stamp, _timestamp_ms(stamp)
+        t = self.last_stamp_ms
+        if t is None or (self.last_time is not None and t < self.last_time):
+            # Missing or out-of-order timestamps stay on the previous point
+            t = self.last_time
+        for entry in entries:
+            if entry['role'] == 'system' and entry['toolName'] == 'compaction':
+                if t is not None:
+                    self.compactions.append({'t': t, 'tokensBefore': self.running,
+                                             'tokensAfter': entry['estimatedTokens']})
+                self.running = entry['estimatedTokens']
+            else:
+                self.running += entry['estimatedTokens']
+        self.peak = max(self.peak, self.running)
+        if t is None:
+            return
+        self.last_time = t
+        self.times.append(t)
+        self.tokens.append(self.running)
+
+    @property
+    def lines(self):
+        return len(self.line_offsets)
+
+    def total(self, show_tools=True):
+        counts = self.all_counts if show_tools else self.message_counts
+        return counts[-1] if counts else 0
+
+    def page(self, offset, limit, show_tools=True):
+        """Entries [offset, offset + limit) counting back from the newest"""
+        counts = self.all_counts if show_tools else self.message_counts
+        end = max(self.total(show_tools) - offset, 0)
+        start = max(end - limit, 0)
+        if start >= end:
+            return []
+
+        first = bisect.bisect_right(counts, start)
+        skip = start - (counts[first - 1] if first else 0)
+        entries = []
+        with open(self.session_file, 'rb') as f:
+            for line_offset, raw in iter_lines(f, self.line_offsets[first]):
+                if line_offset >= self.offset or len(entries) >= skip + end - start:
+                    break
+                try:
+                    entries.extend(parse_record(json.loads(raw), show_tools))
+                except Exception:
+                    continue  # already accounted for in stats
+        return entries[skip:skip + end - start][::-1]
+
+    def downsampled(self, buckets):
+        if buckets not in self._downsampled:
+            self._downsampled[buckets] = downsample_minmax(self.times, self.tokens, buckets)
+        return self._downsampled[buckets]
+
+_transcript_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+@contextmanager
+def open_transcript(session_file):
+    """Refresh and lock the cached TranscriptIndex for a session file"""
+    with _cache_lock:
+        index = _transcript_cache.pop(session_file, None) or TranscriptIndex(session_file)
+        _transcript_cache[session_file] = index
+    with index.lock:
+        index.refresh()
+        with _cache_lock:
+            # Bound the cache by indexed lines, dropping least recently used first
+            indexed = sum(other.lines for other in _transcript_cache.values())
+            while indexed > MAX_INDEXED_LINES and next(iter(_transcript_cache.values())) is not index:
+                indexed -= _transcript_cache.popitem(last=False)[1].lines
+        yield index
+
+def _unindexed_bytes(session_file):
+    """Bytes of session_file that the cached index (if any) hasn't parsed"""
+    st = os.stat(session_file)
+    with _cache_lock:
+        index = _transcript_cache.get(session_file)
+    if index is None or index.identity != (st.st_dev, st.st_ino) or st.st_size < index.offset:
+        return st.st_size
+    return st.st_size - index.offset
+
+class IndexWarmer:
+    """Builds transcript indexes one at a time on a thread of its own.
+
+    Background requests hand it transcripts that would take a long pass to
+    index, so a cold multi-GB file never holds the background slot. Each
+    build waits until no interactive request is in flight.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.queue = deque()
+        self.thread = None
+
+    def request(self, session_file):
+        with self.cond:
+            if session_file in self.queue:
+                return
+            self.queue.append(session_file)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='index-warmer', daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                session_file = self.queue[0]
+            while scheduler.enabled and scheduler.running['interactive']:
+                time.sleep(0.05)
+            try:
+                with open_transcript(session_file):
+                    pass
+            except OSError:
+                pass
+            with self.cond:
+                self.queue.popleft()
+
+warmer = IndexWarmer()
+
+def _defer_cold_index(session_file):
+    """For a background request, hand a transcript that still needs a long
+    indexing pass to the warmer; return True if the caller should not wait"""
+    if request.headers.get('X-Request-Priority') != 'background':
+        return False
+    if _unindexed_bytes(session_file) <= COLD_INDEX_BYTES:
+        return False
+    warmer.request(session_file)
+    return True
+
+# --- Request scheduling -----------------------------------------------------
+#
+# The dev server runs one thread per request and Python runs one thread at a
+# time, so every poll being handled slows down whatever else is in flight.
+# Interactive requests are therefore admitted at once, while background ones
+# (which the UI marks with an X-Request-Priority header) run at most
+# BACKGROUND_WORKERS at a time and only when no interactive request is in
+# flight. Each client, meaning each browser tab, also gets a token bucket per
+# priority so one noisy tab can't flood the queue.
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def take(self, now):
+        """Spend a token; return 0, or the seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+class RequestScheduler:
+    """Per-client rate limits plus strict priority for API requests"""
+
+    def __init__(self, background_workers):
+        self.enabled = True
+        self.background_workers = background_workers
+        self.lock = threading.Lock()
+        self.running = {'interactive': 0, 'background': 0}
+        # One condition per queued background request, oldest first, so only
+        # the head is woken rather than every waiting thread
+        self.waiting = deque()
+        self.buckets = OrderedDict()  # least recently seen client first
+        self.buckets_lock = threading.Lock()
+        self.rate_limited = 0
+        self.timed_out = 0
+
+    def throttle(self, client, priority):
+        """Return 0 if the client may proceed, else seconds until it may retry"""
+        now = time.monotonic()
+        key = (client, priority)
+        with self.buckets_lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(*RATE_LIMITS[priority])
+                if len(self.buckets) > MAX_TRACKED_CLIENTS:
+                    self.buckets.popitem(last=False)
+            else:
+                self.buckets.move_to_end(key)
+            wait = bucket.take(now)
+            if wait:
+                self.rate_limited += 1
+        return wait
+
+    def _background_may_run(self):
+        return not self.running['interactive'] and self.running['background'] < self.background_workers
+
+    def _wake_next(self):
+        if self.waiting and self._background_may_run():
+            self.waiting[0].notify()
+
+    def acquire(self, priority, timeout=None):
+        """Admit a request; False if a background one waited past timeout"""
+        with self.lock:
+            if priority == 'interactive':
+                self.running['interactive'] += 1
+                return True
+
+            turn = threading.Condition(self.lock)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            self.waiting.append(turn)
+            while self.waiting[0] is not turn or not self._background_may_run():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.waiting.remove(turn)
+                    self.timed_out += 1
+                    self._wake_next()
+                    return False
+                turn.wait(remaining)
+            self.waiting.popleft()
+            self.running['background'] += 1
+            self._wake_next()
+            return True
+
+    def release(self, priority):
+        with self.lock:
+            self.running[priority] -= 1
+            self._wake_next()
+
+    def to_dict(self):
+        with self.lock:
+            running = dict(self.running)
+            queued = len(self.waiting)
+        return {
+            'enabled': self.enabled,
+            'backgroundWorkers': self.background_workers,
+            'running': running,
+            'queued': queued,
+            'trackedClients': len(self.buckets),
+            'rateLimited': self.rate_limited,
+            'timedOut': self.timed_out
+        }
+
+scheduler = RequestScheduler(BACKGROUND_WORKERS)
+
+def _busy_response(message, status, retry_after):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+def _client_id():
+    """The tab's own id when the UI sends one, else the remote address.
+
+    Through an SSH tunnel every tab arrives from 127.0.0.1, so the address
+    alone would make all of them share one rate limit.
+    """
+    tab = request.headers.get('X-Client-Id', '')[:64]
+    return f"{request.remote_addr}/{tab}" if tab else request.remote_addr
+
+@app.before_request
+def schedule_request():
+    if not scheduler.enabled or not request.path.startswith('/api/'):
+        return None
+
+    priority = 'background' if request.headers.get('X-Request-Priority') == 'background' else 'interactive'
+    retry_after = scheduler.throttle(_client_id(), RATE_BUCKETS.get(request.path, priority))
+    if retry_after:
+        return _busy_response('rate limited', 429, retry_after)
+
+    timeout = BACKGROUND_QUEUE_TIMEOUT if priority == 'background' else None
+    if not scheduler.acquire(priority, timeout):
+        return _busy_response('server busy', 503, 1)
+    g.scheduled = priority
+    return None
+
+@app.teardown_request
+def release_request(exc):
+    priority = g.pop('scheduled', None)
+    if priority:
+        scheduler.release(priority)
+
+def _file_etag(session_file, *params):
+    """Validator for a response derived from session_file and params"""
+    st = os.stat(session_file)
+    return '-'.join(str(p) for p in (st.st_ino, st.st_size, st.st_mtime_ns) + params)
+
+def _not_modified(etag):
+    """A 304 if the client already has this version, else None.
+
+    Most tail polls find nothing new; answering them before any parsing or
+    serialisation keeps them from competing with interactive requests.
+    """
+    if not request.if_none_match.contains(etag):
+        return None
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+# Serialised transcript pages keyed by ETag: dashboards tailing the same
+# session ask for the same page version, so it is built once
+_page_cache = OrderedDict()
+_page_cache_bytes = 0
+_page_cache_lock = threading.Lock()
+
+def _cached_page(etag):
+    with _page_cache_lock:
+        body = _page_cache.get(etag)
+        if body is not None:
+            _page_cache.move_to_end(etag)
+        return body
+
+def _cache_page(etag, body):
+    global _page_cache_bytes
+    with _page_cache_lock:
+        if etag in _page_cache or len(body) > PAGE_CACHE_BYTES:
+            return
+        _page_cache[etag] = body
+        _page_cache_bytes += len(body)
+        while _page_cache_bytes > PAGE_CACHE_BYTES:
+            _page_cache_bytes -= len(_page_cache.popitem(last=False)[1])
+
+def _with_etag(response, etag):
+    # no-cache: browsers keep the body but revalidate with If-None-Match
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/')
+def index():
+    return render_template_string(HTML_TEMPLATE)
+
+@app.route('/api/sessions')
+def api_sessions():
+    return jsonify(list_sessions())
+
+@app.route('/api/transcript')
+def api_transcript():
+    key = request.args.get('key', '')
+    show_tools = request.args.get('tools', 'true') == 'true'
+    limit = int(request.args.get('limit', '200'))
+    offset = int(request.args.get('offset', '0'))
+    
+    # Find the session
+    session_file, display_name = find_session(key)
     
-    # Reverse so latest entries appear first
-    entries.reverse()
+    if not session_file or not os.path.exists(session_file):
+        return jsonify({'entries': [], 'displayName': display_name})
     
-    total = len(entries)
-    entries = entries[offset:offset + limit]
+    try:
+        etag = _file_etag(session_file, 'transcript', int(show_tools), offset, limit)
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+        body = _cached_page(etag)
+        if body is not None:
+            return _with_etag(app.response_class(body, mimetype='application/json'), etag)
+        if _defer_cold_index(session_file):
+            return _busy_response('indexing', 503, 2)
+        with open_transcript(session_file) as index:
+            # Latest entries first
+            total = index.total(show_tools)
+            entries = index.page(offset, limit, show_tools)
+            parse = index.stats.to_dict()
+    except OSError as e:
+        return jsonify({'entries': [], 'displayName': display_name, 'error': str(e)})
 
-    return jsonify({
+    response = jsonify({
         'entries': entries,
         'displayName': display_name,
         'total': total,
         'offset': offset,
         'limit': limit,
-        'hasMore': (offset + limit) < total
+        'hasMore': (offset + limit) < total,
+        'parse': parse
     })
+    _cache_page(etag, response.get_data())
+    return _with_etag(response, etag)
 
-if __name__ == '__main__':
-    import argparse
-    parser = argparse.ArgumentParser()
+@app.route('/api/metrics')
+def api_metrics():
+    with _cache_lock:
+        indexes = list(_transcript_cache.values())
+
+    transcripts = {'cached': len(indexes), 'warming': len(warmer.queue), 'indexedLines': 0, 'lines': 0,
+                   'malformed': 0, 'unknownType': 0, 'partialLines': 0}
+    for index in indexes:
+        with index.lock:
+            transcripts['indexedLines'] += index.lines
+            transcripts['lines'] += index.stats.lines
+            transcripts['malformed'] += index.stats.malformed
+            transcripts['unknownType'] += index.stats.unknown_type
+            transcripts['partialLines'] += index.stats.pending is not None
+
+    return jsonify({
+        'discoveryErrors': dict(discovery_errors),
+        'transcripts': transcripts,
+        'scheduler': scheduler.to_dict()
+    })
+
+@app.route('/api/timeline')
+def api_timeline():
+    key = request.args.get('key', '')
+    buckets = min(max(int(request.args.get('buckets', TIMELINE_BUCKETS)), 1), 2000)
+
+    session_file, display_name = find_session(key)
+
+    if not session_file or not os.path.exists(session_file):
+        return jsonify({'points': [], 'compactions': [], 'displayName': display_name})
+
+    try:
+        etag = _file_etag(session_file, 'timeline', buckets)
+        not_modified = _not_modified(etag)
+        if not_modified:
+            return not_modified
+        if _defer_cold_index(session_file):
+            return _busy_response('indexing', 503, 2)
+        with open_transcript(session_file) as index:
+            return _with_etag(jsonify({
+                'points': index.downsampled(buckets),
+                'compactions': list(index.compactions),
+                'samples': len(index.times),
+                'current': index.running,
+                'peak': index.peak,
+                'displayName': display_name,
+                'parse': index.stats.to_dict()
+            }), etag)
+    except OSError as e:
+        return jsonify({'points': [], 'compactions': [], 'displayName': display_name, 'error': str(e)})
+
+@app.route('/api/timelines')
+def api_timelines():
+    """Sparkline data for several sessions (repeated key parameters) at once.
+
+    Once COLD_INDEX_BYTES of unindexed transcript have been taken on, the
+    rest are queued for the warmer and reported as pending, so a
+    dashboard's first load doesn't parse every transcript inside one
+    request.
+    """
+    keys = request.args.getlist('key')[:MAX_TIMELINE_KEYS]
+    buckets = min(max(int(request.args.get('buckets', TIMELINE_BUCKETS)), 1), 2000)
+    files = {s['key']: s['sessionFile'] for s in list_sessions()}
+
+    timelines = {}
+    budget = COLD_INDEX_BYTES
+    for key in keys:
+        session_file = files.get(key)
+        try:
+            if not session_file or not os.path.exists(session_file):
+                timelines[key] = {'points': [], 'compactions': []}
+                continue
+            unindexed = _unindexed_bytes(session_file)
+            if unindexed > budget:
+                warmer.request(session_file)
+                timelines[key] = {'pending': True}
+            else:
+                budget -= unindexed
+                with open_transcript(session_file) as index:
+                    timelines[key] = {
+                        'points': index.downsampled(buckets),
+                        'compactions': list(index.compactions),
+                        'current': index.running,
+                        'peak': index.peak
+                    }
+        except OSError as e:
+            timelines[key] = {'points': [], 'compactions': [], 'error': str(e)}
+    return jsonify(timelines)
+
+
+# --- Headless CLI -----------------------------------------------------------
+#
+# Same discovery and parsing as the web UI, but streamed straight to stdout so
+# transcripts can be read over plain SSH and piped into other tools.
+
+EXPORT_FIELDS = ['timestamp', 'role', 'toolName', 'chars', 'estimatedTokens', 'content']
+PARQUET_BATCH_ROWS = 10000
+
+def _resolve_session(target):
+    """Accept either a session key or a path to a .jsonl transcript"""
+    if target.endswith('.jsonl') and os.path.isfile(target):
+        return target, os.path.basename(target)
+    session_file, display_name = find_session(target)
+    if not session_file or not os.path.exists(session_file):
+        sys.exit(f"session not found: {target}")
+    return session_file, display_name
+
+def _format_entry(entry):
+    header = entry['role'] + (f": {entry['toolName']}" if entry['toolName'] else '')
+    return (f"--- [{entry['timestamp']}] {header} "
+            f"({entry['chars']} chars / ~{entry['estimatedTokens']} tokens)\n"
+            f"{entry['content']}\n")
+
+def _emit(entries, as_json):
+    out = sys.stdout
+    for entry in entries:
+        out.write(json.dumps(entry) + '\n' if as_json else _format_entry(entry))
+    out.flush()
+
+def _report_skipped(stats):
+    if stats.malformed or stats.unknown_type or stats.pending is not None:
+        print(f"skipped {stats.malformed} malformed and {stats.unknown_type} unknown-type lines"
+              f"{', last line incomplete' if stats.pending is not None else ''}", file=sys.stderr)
+
+def cmd_list(args):
+    sessions = list_sessions()
+    if args.json:
+        _emit(sessions, True)
+        return
+
+    for s in sessions:
+        pct = round(s['totalTokens'] / s['contextTokens'] * 100) if s['contextTokens'] else 0
+        updated = s['updatedAt'] or 0
+        if updated > 1e12:
+            updated /= 1000  # OpenClaw stores milliseconds
+        updated = datetime.fromtimestamp(updated).strftime('%Y-%m-%d %H:%M') if updated else '-'
+        print(f"{updated:16}  {s['totalTokens']:>8} {pct:>3}%  {s['fileSize']:>10}  {s['model']:<24}  {s['key']}")
+
+def cmd_show(args):
+    session_file, _ = _resolve_session(args.session)
+    stats = ParseStats()
+    # JSON output is for other tools, so it carries whole entries
+    entries = iter_transcript(session_file, not args.no_tools, stats=stats, full=args.json)
+    stop = args.offset + args.limit if args.limit is not None else None
+    _emit(itertools.islice(entries, args.offset, stop), args.json)
+    if stop is None:
+        _report_skipped(stats)
+
+def cmd_tail(args):
+    session_file, _ = _resolve_session(args.session)
+    show_tools = not args.no_tools
+
+    # Walk back from EOF until N entries are found, so the start-up cost
+    # depends on N rather than on the size of the transcript
+    stats = ParseStats()
+    chunks = []  # entries per line, newest line first
+    found = 0
+    with open(session_file, 'rb') as f:
+        pos = os.fstat(f.fileno()).st_size
+        end = pos
+        for offset, raw in iter_lines_reversed(f, end):
+            # Checked before the count so -n 0 also follows from its start
+            if offset + len(raw) == end and _is_unfinished(raw):
+                # Still being flushed: follow from its start once it grows
+                stats.pending = end
+                pos = offset
+                continue
+            if found >= args.lines:
+                break
+            entries = _parse_line(raw, offset, stats, show_tools, full=args.json)
+            chunks.append(entries)
+            found += len(entries)
+    last = [entry for entries in reversed(chunks) for entry in entries]
+    _emit(last[max(len(last) - args.lines, 0):], args.json)
+    _report_skipped(stats)
+
+    if not args.follow:
+        return
+
+    while True:
+        time.sleep(args.interval)
+        try:
+            size = os.path.getsize(session_file)
+        except OSError:
+            continue
+        if size < pos:
+            # Truncated or rewritten in place: start over from the top
+            pos = 0
+        if size == pos or size == stats.pending:
+            continue
+        # Fresh tally per batch so only newly skipped lines are reported
+        stats = ParseStats()
+        new_entries = []
+        with open(session_file, 'rb') as f:
+            for pos, entries in scan_transcript(f, stats, show_tools, start=pos, full=args.json):
+                new_entries.extend(entries)
+        _emit(new_entries, args.json)
+        _report_skipped(stats)
+
+def _parquet_schema():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        sys.exit("parquet export requires pyarrow (pip install pyarrow)")
+
+    return pa.schema([
+        ('timestamp', pa.string()),
+        ('role', pa.string()),
+        ('toolName', pa.string()),
+        ('chars', pa.int64()),
+        ('estimatedTokens', pa.int64()),
+        ('content', pa.string()),
+    ])
+
+def _parquet_row(entry):
+    # Transcripts may carry numeric timestamps; the column is text
+    row = dict(entry)
+    for field in ('timestamp', 'role', 'toolName'):
+        if row[field] is not None:
+            row[field] = str(row[field])
+    return row
+
+def _export_parquet(entries, out, schema):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    with pq.ParquetWriter(out, schema) as writer:
+        while True:
+            batch = [_parquet_row(entry) for entry in itertools.islice(entries, PARQUET_BATCH_ROWS)]
+            if not batch:
+                break
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+
+def cmd_export(args):
+    session_file, _ = _resolve_session(args.session)
+    stats = ParseStats()
+    entries = iter_transcript(session_file, not args.no_tools, stats=stats, full=True)
+
+    binary = args.format == 'parquet'
+    # Check for pyarrow before creating the output file
+    schema = _parquet_schema() if binary else None
+    if args.output in (None, '-'):
+        out = sys.stdout.buffer if binary else sys.stdout
+        close = False
+    else:
+        out = open(args.output, 'wb' if binary else 'w', newline='' if not binary else None)
+        close = True
+
+    try:
+        if args.format == 'jsonl':
+            for entry in entries:
+                out.write(json.dumps(entry) + '\n')
+        elif args.format == 'csv':
+            writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(entries)
+        else:
+            _export_parquet(entries, out, schema)
+        out.flush()
+    except Exception:
+        if close:
+            # Don't leave a truncated export behind
+            out.close()
+            os.remove(args.output)
+            close = False
+        raise
+    finally:
+        if close:
+            out.close()
+    _report_skipped(stats)
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="OpenClaw session viewer (web UI, or headless with a subcommand)")
     parser.add_argument('--host', default='0.0.0.0')
     parser.add_argument('--port', type=int, default=8766)
-    args = parser.parse_args()
-    
+    parser.add_argument('--agents-dir', default=AGENTS_DIR, help="OpenClaw agents directory")
+    parser.add_argument('--no-scheduler', action='store_true', help="serve without request priority or rate limits")
+    parser.add_argument('--page-cache-mb', type=float, default=PAGE_CACHE_BYTES / 1024 / 1024,
+                        help="memory for built transcript pages shared between clients (0 disables)")
+    sub = parser.add_subparsers(dest='command', metavar='{list,show,tail,export}')
+
+    def session_parser(name, help):
+        p = sub.add_parser(name, help=help)
+        p.add_argument('session', help="session key, or path to a .jsonl transcript")
+        p.add_argument('--no-tools', action='store_true', help="skip tool use/result entries")
+        return p
+
+    p = sub.add_parser('list', help="list sessions across all agents")
+    p.add_argument('--json', action='store_true', help="one JSON object per line")
+    p.set_defaults(func=cmd_list)
+
+    p = session_parser('show', "print transcript entries, oldest first")
+    p.add_argument('--offset', type=int, default=0, help="entries to skip from the start")
+    p.add_argument('--limit', type=int, default=None, help="maximum entries to print")
+    p.add_argument('--json', action='store_true', help="one JSON object per line")
+    p.set_defaults(func=cmd_show)
+
+    p = session_parser('tail', "print the last entries, optionally following the file")
+    p.add_argument('-n', '--lines', type=int, default=20, help="entries to print before following")
+    p.add_argument('-f', '--follow', action='store_true', help="keep printing entries as they are appended")
+    p.add_argument('--interval', type=float, default=1.0, help="poll interval in seconds when following")
+    p.add_argument('--json', action='store_true', help="one JSON object per line")
+    p.set_defaults(func=cmd_tail)
+
+    p = session_parser('export', "write the full transcript as jsonl, csv or parquet")
+    p.add_argument('--format', choices=['jsonl', 'csv', 'parquet'], default='jsonl')
+    p.add_argument('-o', '--output', default=None, help="output file (default: stdout)")
+    p.set_defaults(func=cmd_export)
+
+    return parser
+
+if __name__ == '__main__':
+    args = build_parser().parse_args()
+    AGENTS_DIR = os.path.expanduser(args.agents_dir)
+
+    if args.command:
+        try:
+            args.func(args)
+        except KeyboardInterrupt:
+            pass
+        except BrokenPipeError:
+            # Downstream closed early (e.g. `| head`); silence the flush at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
+
+    PAGE_CACHE_BYTES = int(args.page_cache_mb * 1024 * 1024)
+    scheduler.enabled = not args.no_scheduler
     print(f"📊 Session Viewer running at http://localhost:{args.port}")
     app.run(host=args.host, port=args.port, threaded=True)